@@ -1,9 +1,9 @@
 """This module contains aptly client class and all associated data types"""
 
+import json
 import logging
 import re
 import os
-import json
 import hashlib
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -29,6 +29,23 @@ from aptly_ctl.debian import Version, get_control_file_fields
 from aptly_ctl.util import urljoin, timedelta_pretty
 from aptly_ctl import VERSION
 
+
+def _json_dumps(__obj: Any) -> bytes:
+    """Encode object as json"""
+    return json.dumps(__obj).encode("utf-8")
+
+
+def _json_loads(__data: Union[bytes, str]) -> Any:
+    """Decode json document"""
+    return json.loads(__data)
+
+
+try:
+    # orjson is an optional faster replacement for encoding and decoding API json
+    from orjson import dumps as _json_dumps, loads as _json_loads  # type: ignore[import,no-redef]
+except ImportError:
+    pass
+
 log = logging.getLogger(__name__)
 
 KEY_REGEXP = re.compile(r"(\w*?)P(\w+) (\S+) (\S+) (\w+)$")
@@ -461,9 +478,7 @@ class Client:  # pylint: disable=too-many-public-methods
             log.debug("sending %s %s files: %s", method, url, filenames)
             resp = self.http.request_encode_body(method, url, fields=files)
         else:
-            encoded_data = (
-                json.dumps(data).encode("utf-8") if data is not None else None
-            )
+            encoded_data = _json_dumps(data) if data is not None else None
             log.debug("sending %s %s data: %s", method, url, encoded_data)
             resp = self.http.request(
                 method,
@@ -481,7 +496,7 @@ class Client:  # pylint: disable=too-many-public-methods
         )
         if resp.status < 200 or resp.status >= 300:
             raise AptlyApiError(resp.status, resp.data)
-        resp_data = json.loads(resp.data.decode("utf-8"))
+        resp_data = _json_loads(resp.data)
         return resp_data
 
     def files_upload(self, files: Sequence[str], directory: str) -> List[str]:
@@ -1046,19 +1061,24 @@ def search(  # pylint: disable=too-many-locals
     repos = aptly.repo_list() if search_repos else []
     snapshots = aptly.snapshot_list() if search_snapshots else []
     if store_filter:
-        repos = [repo for repo in repos if store_filter.search(repo.name)]
-        snapshots = [snap for snap in snapshots if store_filter.search(snap.name)]
+        matches = store_filter.search
+        repos = [repo for repo in repos if matches(repo.name)]
+        snapshots = [snap for snap in snapshots if matches(snap.name)]
 
-    def worker(
-        store: Union[Repo, Snapshot], is_local_repo: bool, query: str
-    ) -> Tuple[Union[Repo, Snapshot], List[Package]]:
-        pkg = None
+    def parse_query(query: str) -> Tuple[str, Optional[Package]]:
+        """return query to send to aptly and a package if query is a package key"""
         try:
             pkg = Package.from_key(query)
-            query = pkg.dir_ref
         except InvalidPackageKey:
-            pass
+            return query, None
+        return pkg.dir_ref, pkg
 
+    def worker(
+        store: Union[Repo, Snapshot],
+        is_local_repo: bool,
+        query: str,
+        pkg: Optional[Package],
+    ) -> Tuple[Union[Repo, Snapshot], List[Package]]:
         if is_local_repo:
             pkgs = aptly.repo_search(store.name, query, with_deps, details)
         else:
@@ -1074,11 +1094,12 @@ def search(  # pylint: disable=too-many-locals
     errors = []
     with ThreadPoolExecutor(max_workers=max_workers) as exe:
         try:
-            for query in queries:
+            # every query is parsed once rather than once per repo and snapshot
+            for query, pkg in map(parse_query, queries):
                 for repo in repos:
-                    futures.append(exe.submit(worker, repo, True, query))
+                    futures.append(exe.submit(worker, repo, True, query, pkg))
                 for snap in snapshots:
-                    futures.append(exe.submit(worker, snap, False, query))
+                    futures.append(exe.submit(worker, snap, False, query, pkg))
             for future in as_completed(futures, 300):
                 try:
                     store, packages = future.result()
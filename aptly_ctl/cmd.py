@@ -1,8 +1,12 @@
 """This module contains command line entrypoint and functions for corresponding subcommands"""
+from __future__ import annotations
 import argparse
+import functools
 import logging
 import re
+from operator import attrgetter, itemgetter
 from typing import (
+    Callable,
     Iterable,
     Any,
     List,
@@ -10,47 +14,97 @@ from typing import (
     Optional,
     Tuple,
     Dict,
+    FrozenSet,
     Pattern,
-    Container,
     Generator,
+    TYPE_CHECKING,
     cast,
 )
 import sys
 import os
-from datetime import datetime
-import string
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-import urllib3.exceptions  # type: ignore # https://github.com/urllib3/urllib3/issues/1897
-from urllib3 import Timeout
 from aptly_ctl import VERSION
-from aptly_ctl.aptly import (
-    Client,
-    Repo,
-    Snapshot,
-    Package,
-    search,
-    PackageFileInfo,
-    Publish,
-    Source,
-    InvalidPackageKey,
-)
-from aptly_ctl.config import Config, parse_override_dict
-from aptly_ctl.debian import Version
 from aptly_ctl.exceptions import AptlyCtlError, AptlyApiError
 from aptly_ctl.util import print_table, size_pretty
 
+if TYPE_CHECKING:
+    from datetime import datetime
+    from aptly_ctl.aptly import (
+        Client,
+        Repo,
+        Snapshot,
+        Package,
+        PackageFileInfo,
+        Publish,
+    )
+
+# The API client stack (aptly_ctl.aptly, aptly_ctl.config, urllib3) is imported
+# where it is used, so that help output and argument errors don't pay for it
+# pylint: disable=import-outside-toplevel
+
 log = logging.getLogger(__name__)
 
 PACKAGE_QUERY_DOC_URL = "https://www.aptly.info/doc/feature/query/"
 DEBIAN_POLICY_BUT_AUTOMATIC_UPGRADES_LINK = "https://wiki.debian.org/DebianRepository/Format#NotAutomatic_and_ButAutomaticUpgrades"
 
+ENDPOINT_AND_PREFIX_HELP = """
+<endpoint> - publishing endpoint, if not specified, it would default to empty endpoint (local file system).
+<prefix> - publishing prefix, if not specified, it would default to empty prefix (.)
+"""
+
+# order of fields in 'package show' output. The rest of fields go in between sorted
+PACKAGE_SHOW_FIRST_FIELDS = ("Package", "Version", "Architecture")
+PACKAGE_SHOW_LAST_FIELDS = ("Description",)
+PACKAGE_SHOW_SKIP_FIELDS = frozenset(
+    PACKAGE_SHOW_FIRST_FIELDS + PACKAGE_SHOW_LAST_FIELDS + ("Key", "ShortKey")
+)
+
+
+# pylint: disable-next=protected-access
+class LazySubParsersAction(argparse._SubParsersAction):
+    """
+    Subparsers action that defers configuring subparsers until they are selected.
+    Pass a configuring function as 'configure' keyword argument to add_parser.
+    It is called with the subparser as the only argument right before
+    the subparser parses its arguments
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._configurators: Dict[
+            argparse.ArgumentParser, Callable[[argparse.ArgumentParser], None]
+        ] = {}
+
+    def add_parser(self, name: str, **kwargs: Any) -> argparse.ArgumentParser:
+        configure = kwargs.pop("configure", None)
+        parser = super().add_parser(name, **kwargs)
+        if configure is not None:
+            self._configurators[parser] = configure
+        return parser
+
+    def __call__(
+        self,
+        parser: argparse.ArgumentParser,
+        namespace: argparse.Namespace,
+        values: Any,
+        option_string: Optional[str] = None,
+    ) -> None:
+        # argparse has validated the choice by the time the action is called
+        subparser = self._name_parser_map[values[0]]
+        configure = self._configurators.pop(subparser, None)
+        if configure is not None:
+            configure(subparser)
+        super().__call__(parser, namespace, values, option_string)
+
 
 def regex(pattern: str) -> re.Pattern:
     """Compile pattern into regex object"""
     try:
         return re.compile(pattern)
     except re.error as exc:
-        raise argparse.ArgumentTypeError("Invalid regex '{}': {}".format(pattern, exc))
+        raise argparse.ArgumentTypeError(f"Invalid regex '{pattern}': {exc}")
 
 
 def str_list(str_list_raw: str) -> List[str]:
@@ -58,19 +112,26 @@ def str_list(str_list_raw: str) -> List[str]:
     return [elem for elem in str_list_raw.split(",") if elem]
 
 
+def parse_endpoint_and_prefix(endpoint_and_prefix_raw: str) -> Tuple[str, str]:
+    """Split '[<endpoint>:]<prefix>' into storage and prefix"""
+    storage, _, prefix = endpoint_and_prefix_raw.rpartition(":")
+    return storage, prefix
+
+
 def update_dependent_publishes(
     aptly: Client,
-    repo_names: Container[str],
+    repo_names: Iterable[str],
     dry_run: bool,
+    max_workers: int,
 ) -> None:
     """Find and update publishes, that were created from local repos, listed in repo_names argument"""
-    publishes = set()
-    for publish in aptly.publish_list():
-        if publish.source_kind != "local":
-            continue
-        for source in publish.sources:
-            if source.name in repo_names:
-                publishes.add(publish)
+    names = frozenset(repo_names)
+    publishes = {
+        publish
+        for publish in aptly.publish_list()
+        if publish.source_kind == "local"
+        and any(source.name in names for source in publish.sources)
+    }
 
     if not publishes:
         return
@@ -82,11 +143,14 @@ def update_dependent_publishes(
 
     updated_publishes = []
     failed_to_updated_publishes = []
-    for publish in publishes:
-        try:
-            updated_publishes.append(aptly.publish_update(publish))
-        except AptlyApiError as exc:
-            failed_to_updated_publishes.append([str(publish), int(exc.status), exc])
+    # publishes are independent, so update them concurrently
+    with ThreadPoolExecutor(max_workers=max_workers) as exe:
+        futures = [(pub, exe.submit(aptly.publish_update, pub)) for pub in publishes]
+        for publish, future in futures:
+            try:
+                updated_publishes.append(future.result())
+            except AptlyApiError as exc:
+                failed_to_updated_publishes.append([str(publish), int(exc.status), exc])
 
     print_table([[str(p)] for p in updated_publishes], ["Updated publishes"])
 
@@ -118,23 +182,21 @@ def package_show(parser: argparse.ArgumentParser) -> None:
         help="package key or query",
     )
 
-    first_fileds = ["Package", "Version", "Architecture"]
-    last_fields = ["Description"]
-    skip_fields = set(first_fileds) | set(last_fields) | {"Key", "ShortKey"}
-
     def print_packages(packages: Iterable[Package]) -> None:
         for package in packages:
             if not package.fields:
                 raise RuntimeError("package fileds are empty")
-            print('"', package.key, '"', sep="")
-            for field in first_fileds:
-                print("   ", field, ":", package.fields[field])
-            for field in sorted(package.fields.keys()):
-                if field in skip_fields:
-                    continue
-                print("   ", field, ":", package.fields[field])
-            for field in last_fields:
-                print("   ", field, ":", package.fields[field])
+            fields = package.fields
+            ordered_fields = [
+                *PACKAGE_SHOW_FIRST_FIELDS,
+                *sorted(fields.keys() - PACKAGE_SHOW_SKIP_FIELDS),
+                *PACKAGE_SHOW_LAST_FIELDS,
+            ]
+            lines = [f'"{package.key}"']
+            lines.extend(f"    {field} : {fields[field]}" for field in ordered_fields)
+            lines.append("")
+            # a single write per package instead of a print call per field
+            sys.stdout.write("\n".join(lines))
 
     def action(
         *,
@@ -143,26 +205,31 @@ def package_show(parser: argparse.ArgumentParser) -> None:
         keys_or_queries: Iterable[str],
         **_unused: Any,
     ) -> None:
-        keys = []
+        from aptly_ctl.aptly import KEY_REGEXP, search
+
+        # dict keeps the order of keys while dropping duplicates
+        keys: Dict[str, None] = {}
         queries = []
         for key_or_query in keys_or_queries:
-            try:
-                Package.from_key(key_or_query)
-                keys.append(key_or_query)
-            except InvalidPackageKey:
+            # only the key syntax matters here, the Package itself isn't needed
+            if KEY_REGEXP.match(key_or_query):
+                keys[key_or_query] = None
+            else:
                 queries.append(key_or_query)
 
         pkgs = set()
         err_exit = False
-        for key in keys:
-            try:
-                pkgs.add(aptly.package_show(key))
-            except AptlyApiError as exc:
-                if exc.status == 404:
-                    log.error("Package with key '%s' wasn't found", key)
-                    err_exit = True
-                    continue
-                raise
+        with ThreadPoolExecutor(max_workers=max_workers) as exe:
+            futures = [(key, exe.submit(aptly.package_show, key)) for key in keys]
+            for key, future in futures:
+                try:
+                    pkgs.add(future.result())
+                except AptlyApiError as exc:
+                    if exc.status == 404:
+                        log.error("Package with key '%s' wasn't found", key)
+                        err_exit = True
+                        continue
+                    raise
 
         if queries:
             result, errors = search(
@@ -173,7 +240,7 @@ def package_show(parser: argparse.ArgumentParser) -> None:
             )
             pkgs.update(package for _, packages in result for package in packages)
             for error in errors:
-                log.error(error)
+                log.error("%s", error)
                 err_exit = True
 
         print_packages(pkgs)
@@ -244,46 +311,70 @@ def package_search(parser: argparse.ArgumentParser) -> None:
         help="do not print header of the output table",
     )
 
-    def build_out_row(
-        cols: Iterable[str], store: Union[Snapshot, Repo], package: Package
-    ) -> List[Any]:
-        """build a row in a table to be printed"""
-        # pylint: disable=too-many-branches
-        row: List[Union[str, Version]] = []
+    def installed_size(_store: Union[Snapshot, Repo], package: Package) -> int:
+        """return installed size of package in bytes"""
+        assert package.fields
+        return int(package.fields["Installed-Size"]) * 1024
+
+    def size(_store: Union[Snapshot, Repo], package: Package) -> int:
+        """return size of package file in bytes"""
+        assert package.fields
+        return int(package.fields["Size"])
+
+    # getters of output column values that are known regardless of package fields
+    column_getters: Dict[str, Callable[[Union[Snapshot, Repo], Package], Any]] = {
+        # Repo and Snapshot class names are exactly the values to display
+        "store_type": lambda store, package: type(store).__name__,
+        "store_name": lambda store, package: store.name,
+        "package_key": lambda store, package: package.key,
+        "package_key_quoted": lambda store, package: f'"{package.key}"',
+        "package_name": lambda store, package: package.name,
+        "package_arch": lambda store, package: package.arch,
+        "package_version": lambda store, package: package.version,
+        "package_hash": lambda store, package: package.files_hash,
+        "package_dir_ref": lambda store, package: package.dir_ref,
+        # sizes stay numbers so that they are sorted as such and are formatted later
+        "Installed-Size": installed_size,
+        "Size": size,
+    }
+    size_columns = frozenset(["Installed-Size", "Size"])
+
+    def format_sizes(table: List[List[Any]], cols: List[str]) -> None:
+        """replace byte counts in size columns of table with human readable sizes"""
+        size_indexes = [i for i, col in enumerate(cols) if col in size_columns]
+        for row in table:
+            for index in size_indexes:
+                row[index] = size_pretty(row[index])
+
+    def field_getter(col: str) -> Callable[[Union[Snapshot, Repo], Package], Any]:
+        """return getter of package field col"""
+        get_field = itemgetter(col)
+
+        def getter(_store: Union[Snapshot, Repo], package: Package) -> Any:
+            assert package.fields
+            try:
+                return get_field(package.fields)
+            except KeyError:
+                raise AptlyCtlError(f"Unknown output column name: {col}") from None
+
+        return getter
+
+    def build_row_getters(
+        cols: Iterable[str],
+    ) -> List[Callable[[Union[Snapshot, Repo], Package], Any]]:
+        """
+        return getters of every column of a row in a table to be printed,
+        so that column names are resolved once rather than for every row
+        """
+        getters = []
         for col in cols:
-            if col == "store_type":
-                row.append("Snapshot" if isinstance(store, Snapshot) else "Repo")
-            elif col == "store_name":
-                row.append(store.name)
-            elif col == "package_key":
-                row.append(package.key)
-            elif col == "package_key_quoted":
-                row.append('"' + package.key + '"')
-            elif col == "package_name":
-                row.append(package.name)
-            elif col == "package_arch":
-                row.append(package.arch)
-            elif col == "package_version":
-                row.append(package.version)
-            elif col == "package_hash":
-                row.append(package.files_hash)
-            elif col == "package_dir_ref":
-                row.append(package.dir_ref)
-            elif col == "Installed-Size":
-                assert package.fields
-                row.append(size_pretty(int(package.fields[col]) * 1024))
-            elif col == "Size":
-                assert package.fields
-                row.append(size_pretty(int(package.fields[col])))
-            elif col[0] in string.ascii_uppercase:
-                assert package.fields
-                try:
-                    row.append(package.fields[col])
-                except KeyError:
-                    raise AptlyCtlError("Unknown output column name: " + col) from None
+            if col in column_getters:
+                getters.append(column_getters[col])
+            elif col[:1].isupper():
+                getters.append(field_getter(col))
             else:
-                raise AptlyCtlError("Unknown output column name: " + col)
-        return row
+                raise AptlyCtlError(f"Unknown output column name: {col}")
+        return getters
 
     def action(
         *,
@@ -298,8 +389,11 @@ def package_search(parser: argparse.ArgumentParser) -> None:
         no_header: bool,
         **_unused: Any,
     ) -> None:
+        from aptly_ctl.aptly import search
+
         out_columns = base_out_columns + extra_out_columns
-        details = any(col[0] in string.ascii_uppercase for col in out_columns)
+        row_getters = build_row_getters(out_columns)
+        details = any(col[:1].isupper() for col in out_columns)
 
         result, errors = search(
             aptly,
@@ -310,20 +404,19 @@ def package_search(parser: argparse.ArgumentParser) -> None:
             store_filter=store_filter,
         )
         table = [
-            build_out_row(out_columns, store, package)
+            [get(store, package) for get in row_getters]
             for store, packages in result
             for package in packages
         ]
-        # sort table by every column from right to left
-        for index in range(len(out_columns) - 1, -1, -1):
-            # pylint: disable=cell-var-from-loop
-            table.sort(key=lambda row: row[index], reverse=sort_reverse)
+        # rows are lists, so they compare column by column from left to right
+        table.sort(reverse=sort_reverse)
+        format_sizes(table, out_columns)
         if no_header:
             print_table(table)
         else:
             print_table(table, out_columns)
         for error in errors:
-            log.error(error)
+            log.error("%s", error)
         if errors:
             raise AptlyCtlError("Package search finished with errors")
 
@@ -373,6 +466,8 @@ def package_remove(parser: argparse.ArgumentParser) -> None:
         package_queries: List[str],
         **_unused: Any,
     ) -> None:
+        from aptly_ctl.aptly import search
+
         result, errors = search(
             aptly,
             package_queries,
@@ -391,8 +486,9 @@ def package_remove(parser: argparse.ArgumentParser) -> None:
             "package version",
             "package hash",
         ]
+        package_cells = attrgetter("name", "version", "files_hash")
         table = [
-            [repo.name, package.name, package.version, package.files_hash]
+            [repo.name, *package_cells(package)]
             for repo, packages in result
             for package in packages
         ]
@@ -400,7 +496,7 @@ def package_remove(parser: argparse.ArgumentParser) -> None:
         print_table(table, header)
 
         for error in errors:
-            log.error(error)
+            log.error("%s", error)
         if errors:
             raise AptlyCtlError("Package search finished with errors")
 
@@ -416,7 +512,7 @@ def package_remove(parser: argparse.ArgumentParser) -> None:
 
         if update_publishes:
             repo_names = [repo.name for repo, _ in result]
-            update_dependent_publishes(aptly, repo_names, dry_run)
+            update_dependent_publishes(aptly, repo_names, dry_run, max_workers)
 
     parser.set_defaults(func=action)
 
@@ -433,9 +529,7 @@ def repo_list(parser: argparse.ArgumentParser) -> None:
         if not repos:
             print("No local repos!")
             return
-        header = list(repos[0]._fields)
-        table = [list(repo) for repo in sorted(repos)]
-        print_table(table, header=header)
+        print_table(sorted(repos), header=repos[0]._fields)
 
     parser.set_defaults(func=action)
 
@@ -506,7 +600,7 @@ def repo_create_or_edit(parser: argparse.ArgumentParser, is_edit: bool) -> None:
                         f"Failed to create local repo '{repo_name}'"
                     ) from exc
                 raise
-        print_table([list(repo)], header=list(repo._fields))
+        print_table([repo], header=repo._fields)
 
     parser.set_defaults(func=action)
 
@@ -534,24 +628,35 @@ def repo_drop(parser: argparse.ArgumentParser) -> None:
 
 def load_packages_dict(
     package_files: List[str],
+    max_workers: Optional[int] = None,
 ) -> Dict[str, Tuple[Package, PackageFileInfo]]:
-    """load packages from filesystem into dict indexed by package dir_ref"""
-    packages: Dict[str, Tuple[Package, PackageFileInfo]] = {}
-    for pkg_file in package_files:
+    """
+    load packages from filesystem into dict indexed by package dir_ref
+    using up to max_workers threads
+    """
+    from aptly_ctl.aptly import Package
+
+    def load(pkg_file: str) -> Tuple[Package, PackageFileInfo]:
         try:
-            pkg, file_info = Package.from_file(pkg_file)
+            return Package.from_file(pkg_file)
         except Exception as exc:
             raise AptlyCtlError(f"Failed to load package '{pkg_file}'") from exc
-        if pkg.dir_ref in packages:
-            log.error(
-                "Package '%s' (%s) conflicts with '%s' (%s)",
-                file_info.path,
-                pkg.key,
-                packages[pkg.dir_ref][1].path,
-                packages[pkg.dir_ref][0].key,
-            )
-        else:
-            packages[pkg.dir_ref] = (pkg, file_info)
+
+    packages: Dict[str, Tuple[Package, PackageFileInfo]] = {}
+    # hashlib releases the GIL, so files are read and hashed in parallel.
+    # map keeps the order of package_files, so conflicts are reported as before
+    with ThreadPoolExecutor(max_workers=max_workers) as exe:
+        for pkg, file_info in exe.map(load, package_files):
+            if pkg.dir_ref in packages:
+                log.error(
+                    "Package '%s' (%s) conflicts with '%s' (%s)",
+                    file_info.path,
+                    pkg.key,
+                    packages[pkg.dir_ref][1].path,
+                    packages[pkg.dir_ref][0].key,
+                )
+            else:
+                packages[pkg.dir_ref] = (pkg, file_info)
     return packages
 
 
@@ -576,6 +681,7 @@ def repo_add(parser: argparse.ArgumentParser) -> None:
     def action(
         *,
         aptly: Client,
+        max_workers: int,
         force_replace: bool,
         update_publishes: bool,
         repo: str,
@@ -583,13 +689,24 @@ def repo_add(parser: argparse.ArgumentParser) -> None:
         **_unused: Any,
     ) -> None:
         # os.getpid just in case 2 instances launched at the same time
-        directory = f"aptly_ctl_repo_add_{datetime.utcnow():%s}_{os.getpid()}"
-        packages = load_packages_dict(package_files)
+        directory = f"aptly_ctl_repo_add_{time.time_ns()}_{os.getpid()}"
 
         log.info("Uploading packages into directory '%s'", directory)
         try:
             table = []
-            log.debug("Uploaded files %s", aptly.files_upload(package_files, directory))
+            # upload files while they are loaded and hashed locally
+            with ThreadPoolExecutor(max_workers=1) as exe:
+                upload = exe.submit(aptly.files_upload, package_files, directory)
+                try:
+                    packages = load_packages_dict(package_files, max_workers)
+                except AptlyCtlError:
+                    # a started upload can't be interrupted, so wait for it
+                    # to not lose its error in favour of the local one
+                    upload_exc = None if upload.cancel() else upload.exception()
+                    if upload_exc is not None:
+                        log.error("Failed to upload packages: %s", upload_exc)
+                    raise
+                log.debug("Uploaded files %s", upload.result())
             try:
                 files_report = aptly.repo_add_packages(
                     repo, directory, force_replace=force_replace
@@ -601,22 +718,27 @@ def repo_add(parser: argparse.ArgumentParser) -> None:
                     ) from exc
                 raise
             log.debug("Files report is: %s", files_report)
-            for failed_file in files_report.failed:
-                log.error("Failed to add file '%s'", failed_file)
-            for warning in files_report.warnings:
-                log.warning(warning)
-            for removed_file in files_report.removed:
-                log.info("Removed file '%s'", removed_file)
+            # report every category with a single log record
+            if files_report.failed:
+                log.error("Failed to add files: %s", ", ".join(files_report.failed))
+            if files_report.warnings:
+                log.warning("%s", "; ".join(files_report.warnings))
+            if files_report.removed:
+                log.info("Removed files: %s", ", ".join(files_report.removed))
+            not_displayed = []
             for added_file_dir_ref in files_report.added:
-                if added_file_dir_ref in packages:
-                    pkg = packages[added_file_dir_ref][0]
-                    table.append([pkg.name, pkg.version, '"' + pkg.key + '"'])
-                    del packages[added_file_dir_ref]
-                else:
-                    log.error(
-                        "Package %s added but won't displayed in output",
-                        added_file_dir_ref,
-                    )
+                # matched packages are popped so that only unmatched ones are left
+                added = packages.pop(added_file_dir_ref, None)
+                if added is None:
+                    not_displayed.append(added_file_dir_ref)
+                    continue
+                pkg = added[0]
+                table.append([pkg.name, pkg.version, f'"{pkg.key}"'])
+            if not_displayed:
+                log.error(
+                    "Packages added but won't be displayed in output: %s",
+                    ", ".join(not_displayed),
+                )
             if packages:
                 log.error(
                     "Could not match all added dir refs with uploaded packages for this packages: %s",
@@ -630,7 +752,7 @@ def repo_add(parser: argparse.ArgumentParser) -> None:
             aptly.files_delete_dir(directory)
 
         if update_publishes:
-            update_dependent_publishes(aptly, [repo], False)
+            update_dependent_publishes(aptly, [repo], False, max_workers)
 
     parser.set_defaults(func=action)
 
@@ -659,6 +781,7 @@ def repo_remove(parser: argparse.ArgumentParser) -> None:
     def action(
         *,
         aptly: Client,
+        max_workers: int,
         dry_run: bool,
         update_publishes: bool,
         repo_name: str,
@@ -677,7 +800,7 @@ def repo_remove(parser: argparse.ArgumentParser) -> None:
             print_table([[p.key] for p in packages], [f"Deleted from {repo_name}"])
 
         if update_publishes:
-            update_dependent_publishes(aptly, [repo_name], dry_run)
+            update_dependent_publishes(aptly, [repo_name], dry_run, max_workers)
 
     parser.set_defaults(func=action)
 
@@ -716,6 +839,7 @@ def repo_copy_or_move(parser: argparse.ArgumentParser, move: bool) -> None:
     )
 
     operation = "move" if move else "copy"
+    package_cells = attrgetter("name", "version", "dir_ref")
 
     def action(
         *,
@@ -729,6 +853,8 @@ def repo_copy_or_move(parser: argparse.ArgumentParser, move: bool) -> None:
         max_workers: int,
         **_unused: Any,
     ) -> None:
+        from aptly_ctl.aptly import search
+
         try:
             aptly.repo_show(src_repo_name)
         except AptlyApiError as exc:
@@ -741,12 +867,12 @@ def repo_copy_or_move(parser: argparse.ArgumentParser, move: bool) -> None:
             queries,
             with_deps=with_deps,
             max_workers=max_workers,
-            store_filter=re.compile(f"^{src_repo_name}$"),
+            store_filter=re.compile(f"^{re.escape(src_repo_name)}$"),
             search_snapshots=False,
         )
 
         for error in errors:
-            log.error(error)
+            log.error("%s", error)
         if errors:
             raise AptlyCtlError(
                 f"Package search in {src_repo_name} finished with errors"
@@ -754,29 +880,23 @@ def repo_copy_or_move(parser: argparse.ArgumentParser, move: bool) -> None:
         if not result:
             raise AptlyCtlError(f"No packages found to {operation}")
 
-        pkgs = set()
+        # packages found by several queries are deduplicated by key
+        pkgs: Dict[str, Package] = {}
         for repo, packages in result:
             # seems no way we fail here, but just in case abort execution
             assert repo.name == src_repo_name
-            pkgs.update(packages)
+            pkgs.update((pkg.key, pkg) for pkg in packages)
 
         table = [
-            [
-                src_repo_name,
-                dst_repo_name,
-                pkg.name,
-                pkg.version,
-                pkg.dir_ref,
-                f'"{pkg.key}"',
-            ]
-            for pkg in pkgs
+            [src_repo_name, dst_repo_name, *package_cells(pkg), f'"{key}"']
+            for key, pkg in pkgs.items()
         ]
         table.sort()
         print_table(
             table, ["source", "destination", "name", "version", "dir_ref", "key"]
         )
 
-        keys = [pkg.key for pkg in pkgs]
+        keys = list(pkgs)
         try:
             log.info("Adding packages to '%s'", dst_repo_name)
             if not dry_run:
@@ -797,7 +917,7 @@ def repo_copy_or_move(parser: argparse.ArgumentParser, move: bool) -> None:
             pubs_to_update.append(src_repo_name)
 
         if update_publishes:
-            update_dependent_publishes(aptly, pubs_to_update, dry_run)
+            update_dependent_publishes(aptly, pubs_to_update, dry_run, max_workers)
 
     parser.set_defaults(func=action)
 
@@ -850,7 +970,7 @@ def snapshot_create(parser: argparse.ArgumentParser) -> None:
                         f"Failed to create snapshot '{snapshot_name}'"
                     ) from exc
                 raise
-        print_table([list(snapshot)], header=list(snapshot._fields))
+        print_table([snapshot], header=snapshot._fields)
 
     parser.set_defaults(func=action)
 
@@ -893,7 +1013,7 @@ def snapshot_edit(parser: argparse.ArgumentParser) -> None:
                     f"Failed to edit snapshot '{snapshot_name}'"
                 ) from exc
             raise
-        print_table([list(snapshot)], header=list(snapshot._fields))
+        print_table([snapshot], header=snapshot._fields)
 
     parser.set_defaults(func=action)
 
@@ -910,9 +1030,7 @@ def snapshot_list(parser: argparse.ArgumentParser) -> None:
         if not snapshots:
             print("No snapshots!")
             return
-        header = list(snapshots[0]._fields)
-        table = [list(snapshot) for snapshot in sorted(snapshots)]
-        print_table(table, header=header)
+        print_table(sorted(snapshots), header=snapshots[0]._fields)
 
     parser.set_defaults(func=action)
 
@@ -969,29 +1087,31 @@ def snapshot_filter(parser: argparse.ArgumentParser) -> None:
         max_workers: int,
         **_unused: Any,
     ) -> None:
+        from aptly_ctl.aptly import search
+
         result, errors = search(
             aptly,
             queries,
             with_deps,
             max_workers=max_workers,
-            store_filter=re.compile(f"^{source}$"),
+            store_filter=re.compile(f"^{re.escape(source)}$"),
             search_repos=False,
         )
 
         for error in errors:
-            log.error(error)
+            log.error("%s", error)
         if errors:
             raise AptlyCtlError("Failed to filter packages")
 
-        pkgs = set()
+        pkgs: Dict[str, Package] = {}
         for snap, packages in result:
             assert snap.name == source
-            pkgs.update(packages)
+            pkgs.update((pkg.key, pkg) for pkg in packages)
 
         try:
             filtered_snap = aptly.snapshot_create_from_package_keys(
                 destination,
-                [pkg.key for pkg in pkgs],
+                list(pkgs),
                 source_snapshots=[source],
                 description=f"Filtered '{source}', queries were: {queries}",
             )
@@ -1061,43 +1181,54 @@ def snapshot_merge(parser: argparse.ArgumentParser) -> None:
 
     def merge_latest_snap(
         search_result: List[Tuple[Union[Repo, Snapshot], List[Package]]],
-        sources: List[str],
+        sources: FrozenSet[str],
     ) -> Generator[Package, None, None]:
-        pkgs: Dict[str, Tuple[Package, datetime]]
+        pkgs: Dict[Tuple[str, str], Tuple[Package, datetime]] = {}
         for snap, packages in search_result:
-            snap = cast(Snapshot, snap)
+            snap = cast("Snapshot", snap)
             assert snap.name in sources
             for pkg in packages:
-                key = pkg.name + pkg.arch
-                if key in pkgs:
-                    if snap.created_at > pkgs[key][1]:
-                        pkgs[key] = (pkg, snap.created_at)
-                    elif (
-                        snap.created_at == pkgs[key][1]
-                        and pkg.version > pkgs[key][0].version
-                    ):
-                        pkgs[key] = (pkg, snap.created_at)
-                else:
+                key = (pkg.name, pkg.arch)
+                picked = pkgs.get(key)
+                if (
+                    picked is None
+                    or snap.created_at > picked[1]
+                    or (
+                        snap.created_at == picked[1] and pkg.version > picked[0].version
+                    )
+                ):
                     pkgs[key] = (pkg, snap.created_at)
         return (pkg for pkg, _ in pkgs.values())
 
     def merge_latest_ver(
         search_result: List[Tuple[Union[Repo, Snapshot], List[Package]]],
-        sources: List[str],
+        sources: FrozenSet[str],
     ) -> Generator[Package, None, None]:
-        pkgs: Dict[str, Package]
+        pkgs: Dict[Tuple[str, str], Package] = {}
         for snap, packages in search_result:
-            snap = cast(Snapshot, snap)
+            snap = cast("Snapshot", snap)
             assert snap.name in sources
             for pkg in packages:
-                key = pkg.name + pkg.arch
-                if key in pkgs:
-                    if pkg.version > pkgs[key].version:
-                        pkgs[key] = pkg
-                else:
+                key = (pkg.name, pkg.arch)
+                picked = pkgs.get(key)
+                if picked is None or pkg.version > picked.version:
                     pkgs[key] = pkg
         return (pkg for pkg in pkgs.values())
 
+    def merge_copy(
+        search_result: List[Tuple[Union[Repo, Snapshot], List[Package]]],
+        sources: FrozenSet[str],
+    ) -> Generator[Package, None, None]:
+        for snap, packages in search_result:
+            assert snap.name in sources
+            yield from packages
+
+    mergers = {
+        Mode.copy: merge_copy,
+        Mode.latest_snap: merge_latest_snap,
+        Mode.latest_ver: merge_latest_ver,
+    }
+
     def action(
         *,
         aptly: Client,
@@ -1108,6 +1239,8 @@ def snapshot_merge(parser: argparse.ArgumentParser) -> None:
         max_workers: int,
         **_unused: Any,
     ) -> None:
+        from aptly_ctl.aptly import search
+
         if keep or len(sources) == 1:
             mode = Mode.copy
             if latest:
@@ -1119,33 +1252,38 @@ def snapshot_merge(parser: argparse.ArgumentParser) -> None:
         else:
             mode = Mode.latest_snap
 
-        result, errors = search(
-            aptly,
-            max_workers=max_workers,
-            store_filter=re.compile(f"^({'|'.join(sources)})$"),
-            search_repos=False,
-        )
+        pkgs: Dict[str, Package] = {}
 
-        for error in errors:
-            log.error(error)
-        if errors:
-            raise AptlyCtlError("Failed to merge packages")
+        if len(sources) == 1:
+            # nothing to merge, so search the only source directly instead of
+            # listing every snapshot to find it
+            try:
+                packages = aptly.snapshot_search(sources[0])
+            except AptlyApiError as exc:
+                if exc.status == 404:
+                    raise AptlyCtlError("Failed to merge packages") from exc
+                raise
+            pkgs.update((pkg.key, pkg) for pkg in packages)
+        else:
+            result, errors = search(
+                aptly,
+                max_workers=max_workers,
+                store_filter=re.compile(f"^(?:{'|'.join(map(re.escape, sources))})$"),
+                search_repos=False,
+            )
 
-        pkgs = set()
+            for error in errors:
+                log.error("%s", error)
+            if errors:
+                raise AptlyCtlError("Failed to merge packages")
 
-        if mode is Mode.copy:
-            for snap, packages in result:
-                assert snap.name in sources
-                pkgs.update(packages)
-        elif mode is Mode.latest_snap:
-            pkgs.update(merge_latest_snap(result, sources))
-        elif mode is Mode.latest_ver:
-            pkgs.update(merge_latest_ver(result, sources))
+            merged = mergers[mode](result, frozenset(sources))
+            pkgs.update((pkg.key, pkg) for pkg in merged)
 
         try:
             merged_snap = aptly.snapshot_create_from_package_keys(
                 destination,
-                [pkg.key for pkg in pkgs],
+                list(pkgs),
                 source_snapshots=sources,
                 description=f"""Merged ({mode.value}) from sources: '{"', '".join(sources)}'""",
             )
@@ -1174,11 +1312,10 @@ def snapshot_diff(parser: argparse.ArgumentParser) -> None:
         snap_right: str,
         **_unused: Any,
     ) -> None:
-        table = []
-        for left, right in aptly.snapshot_diff(snap_left, snap_right):
-            left_str = "" if left is None else left.key
-            right_str = "" if right is None else right.key
-            table.append([left_str, right_str])
+        table = [
+            ["" if left is None else left.key, "" if right is None else right.key]
+            for left, right in aptly.snapshot_diff(snap_left, snap_right)
+        ]
         print_table(table, [snap_left, snap_right])
 
     parser.set_defaults(func=action)
@@ -1186,15 +1323,16 @@ def snapshot_diff(parser: argparse.ArgumentParser) -> None:
 
 def print_publishes(pubs: Iterable[Publish]) -> None:
     """print a list of Publish instances to stdout"""
+    from aptly_ctl.aptly import Publish
+
     leading_fields = ["source_kind", "distribution", "prefix", "storage"]
     header = list(Publish._fields)
     for field in leading_fields:
         header.remove(field)
         header.insert(0, field)
-    table = [[getattr(pub, attr) for attr in header] for pub in pubs]
-    for index in range(len(leading_fields) - 1, -1, -1):
-        # pylint: disable=cell-var-from-loop
-        table.sort(key=lambda row: row[index])
+    table = list(map(attrgetter(*header), pubs))
+    # leading fields end up in the first columns, so sort by them in one pass
+    table.sort(key=itemgetter(*range(len(leading_fields))))
     print_table(table, header=header)
 
 
@@ -1341,11 +1479,12 @@ def publish_create(
         skip_cleanup: bool,
         **_unused: Any,
     ) -> None:
+        from aptly_ctl.aptly import Source
+
         if but_automatic_upgrades and not not_automatic:
             raise AptlyCtlError(
                 "Can't set --but-automatic-upgrades without setting --not-automatic. "
-                "It is against Debian policy: "
-                + DEBIAN_POLICY_BUT_AUTOMATIC_UPGRADES_LINK
+                f"It is against Debian policy: {DEBIAN_POLICY_BUT_AUTOMATIC_UPGRADES_LINK}"
             )
 
         source_kind = "snapshot" if snapshot_action else "local"
@@ -1396,11 +1535,9 @@ def publish_update(parser: argparse.ArgumentParser) -> None:
         "endpoint_and_prefix",
         metavar="[<endpoint>:]<prefix>",
         nargs="?",
+        type=parse_endpoint_and_prefix,
         default="",
-        help="""
-        <endpoint> - publishing endpoint, if not specified, it would default to empty endpoint (local file system).
-        <prefix> - publishing prefix, if not specified, it would default to empty prefix (.)
-        """,
+        help=ENDPOINT_AND_PREFIX_HELP,
     )
 
     parser.add_argument(
@@ -1414,11 +1551,11 @@ def publish_update(parser: argparse.ArgumentParser) -> None:
         *,
         aptly: Client,
         distribution: str,
-        endpoint_and_prefix: str,
+        endpoint_and_prefix: Tuple[str, str],
         force_overwrite: bool,
         **_unused: Any,
     ) -> None:
-        storage, _, prefix = endpoint_and_prefix.rpartition(":")
+        storage, prefix = endpoint_and_prefix
         publish = aptly.publish_update(
             force_overwrite=force_overwrite,
             distribution=distribution,
@@ -1443,11 +1580,9 @@ def publish_switch(parser: argparse.ArgumentParser) -> None:
         "endpoint_and_prefix",
         metavar="[<endpoint>:]<prefix>",
         nargs="?",
+        type=parse_endpoint_and_prefix,
         default="",
-        help="""
-       <endpoint> - publishing endpoint, if not specified, it would default to empty endpoint (local file system).
-       <prefix> - publishing prefix, if not specified, it would default to empty prefix (.)
-       """,
+        help=ENDPOINT_AND_PREFIX_HELP,
     )
 
     parser.add_argument(
@@ -1481,13 +1616,15 @@ def publish_switch(parser: argparse.ArgumentParser) -> None:
         *,
         aptly: Client,
         distribution: str,
-        endpoint_and_prefix: str,
+        endpoint_and_prefix: Tuple[str, str],
         new_snapshot_names: List[str],
         components: List[str],
         force_overwrite: bool,
         **_unused: Any,
     ) -> None:
-        storage, _, prefix = endpoint_and_prefix.rpartition(":")
+        from aptly_ctl.aptly import Source
+
+        storage, prefix = endpoint_and_prefix
 
         if len(components) != len(new_snapshot_names):
             raise AptlyCtlError(
@@ -1524,11 +1661,9 @@ def publish_drop(parser: argparse.ArgumentParser) -> None:
         "endpoint_and_prefix",
         metavar="[<endpoint>:]<prefix>",
         nargs="?",
+        type=parse_endpoint_and_prefix,
         default="",
-        help="""
-        <endpoint> - publishing endpoint, if not specified, it would default to empty endpoint (local file system).
-        <prefix> - publishing prefix, if not specified, it would default to empty prefix (.)
-        """,
+        help=ENDPOINT_AND_PREFIX_HELP,
     )
 
     parser.add_argument(
@@ -1542,11 +1677,11 @@ def publish_drop(parser: argparse.ArgumentParser) -> None:
         *,
         aptly: Client,
         distribution: str,
-        endpoint_and_prefix: str,
+        endpoint_and_prefix: Tuple[str, str],
         force_drop: bool,
         **_unused: Any,
     ) -> None:
-        storage, _, prefix = endpoint_and_prefix.rpartition(":")
+        storage, prefix = endpoint_and_prefix
         aptly.publish_drop(
             distribution=distribution, storage=storage, prefix=prefix, force=force_drop
         )
@@ -1554,297 +1689,315 @@ def publish_drop(parser: argparse.ArgumentParser) -> None:
     parser.set_defaults(func=action)
 
 
-def parse_args() -> argparse.Namespace:
-    """parse command line arguments"""
-    parser = argparse.ArgumentParser(prog="aptly-ctl")
+def package_subcommand(parser: argparse.ArgumentParser) -> None:
+    """configure 'package' subcommand"""
+    package_actions = parser.add_subparsers(
+        dest="action",
+        metavar="<action>",
+        required=True,
+        action=LazySubParsersAction,
+    )
 
-    parser.add_argument("--version", action="version", version="%(prog)s " + VERSION)
+    package_actions.add_parser(
+        "show",
+        help="show package info",
+        configure=package_show,
+    )
 
-    log_level_parser = parser.add_mutually_exclusive_group()
-    log_level_parser.add_argument(
-        "-v",
-        "--verbose",
-        action="store_true",
-        help="be more verbose",
+    package_actions.add_parser(
+        "search",
+        description="search packages",
+        help="search packages",
+        configure=package_search,
     )
 
-    log_level_parser.add_argument(
-        "--debug",
-        action="store_true",
-        help="enable debug messages",
+    package_actions.add_parser(
+        "remove",
+        description="remove packages from all local repos",
+        help="remove packages from all local repos",
+        configure=package_remove,
     )
 
-    parser.add_argument("-c", "--config", help="path to config file")
 
-    parser.add_argument(
-        "-S",
-        "--section",
-        default="",
-        help="section from config file. By default first one is used",
+def repo_subcommand(parser: argparse.ArgumentParser) -> None:
+    """configure 'repo' subcommand"""
+    repo_actions = parser.add_subparsers(
+        dest="action",
+        metavar="<action>",
+        required=True,
+        action=LazySubParsersAction,
     )
 
-    parser.add_argument(
-        "-C",
-        "--config-key",
-        metavar="KEY=VALUE",
-        action="append",
-        default=[],
-        dest="config_keys",
-        help="""
-        provide value for configuration KEY.
-        Takes precedence over config file.
-        Use dots to set nested fields e.g. signing.gpgkey=somekey
-        """,
+    repo_actions.add_parser(
+        "create",
+        description="create local package repository",
+        help="create local package repository",
+        configure=functools.partial(repo_create_or_edit, is_edit=False),
     )
 
-    parser.add_argument(
-        "--max-workers",
-        type=int,
-        default=5,
-        help="number of worker threads for concurrent requests",
+    repo_actions.add_parser(
+        "edit",
+        description="edit local package repository",
+        help="edit local package repository",
+        configure=functools.partial(repo_create_or_edit, is_edit=True),
     )
 
-    subcommands = parser.add_subparsers(
-        dest="subcommand", metavar="<subcommand>", required=True
+    repo_actions.add_parser(
+        "add",
+        description="add packages to local repository from .deb (binary packages)",
+        help="add packages to local repository from .deb (binary packages)",
+        configure=repo_add,
     )
 
-    # version subcommand
-    version(
-        subcommands.add_parser(
-            "version",
-            aliases=["ver"],
-            description="show aptly server version",
-            help="show aptly server version",
-        )
+    repo_actions.add_parser(
+        "list",
+        description="list local repos",
+        help="list local repos",
+        configure=repo_list,
     )
 
-    # package subcommand
-    package_subcommand = subcommands.add_parser(
-        "package", aliases=["pkg"], help="search packages and show info about them"
+    repo_actions.add_parser(
+        "drop",
+        aliases=["delete"],
+        description="delete local repos",
+        help="delete local repos",
+        configure=repo_drop,
     )
 
-    package_actions = package_subcommand.add_subparsers(
-        dest="action", metavar="<action>", required=True
+    repo_actions.add_parser(
+        "remove",
+        description="remove packages from local repo",
+        help="remove packages from local repo",
+        configure=repo_remove,
     )
 
-    package_show(package_actions.add_parser("show", help="show package info"))
-
-    package_search(
-        package_actions.add_parser(
-            "search", description="search packages", help="search packages"
-        )
+    repo_actions.add_parser(
+        "copy",
+        description="copy packages between local repos",
+        help="copy packages between local repos",
+        configure=functools.partial(repo_copy_or_move, move=False),
     )
 
-    package_remove(
-        package_actions.add_parser(
-            "remove",
-            description="remove packages from all local repos",
-            help="remove packages from all local repos",
-        )
+    repo_actions.add_parser(
+        "move",
+        description="move packages between local repos",
+        help="move packages between local repos",
+        configure=functools.partial(repo_copy_or_move, move=True),
     )
 
-    # repo subcommand
-    repo_subcommand = subcommands.add_parser(
-        "repo", help="manage local repos and add packages to them"
-    )
 
-    repo_actions = repo_subcommand.add_subparsers(
-        dest="action", metavar="<action>", required=True
+def snapshot_subcommand(parser: argparse.ArgumentParser) -> None:
+    """configure 'snapshot' subcommand"""
+    snapshot_actions = parser.add_subparsers(
+        dest="action",
+        metavar="<action>",
+        required=True,
+        action=LazySubParsersAction,
     )
 
-    repo_create_or_edit(
-        repo_actions.add_parser(
-            "create",
-            description="create local package repository",
-            help="create local package repository",
-        ),
-        False,
+    snapshot_actions.add_parser(
+        "create",
+        description="create snapshots from local repos",
+        help="create snapshots from local repos",
+        configure=snapshot_create,
     )
 
-    repo_create_or_edit(
-        repo_actions.add_parser(
-            "edit",
-            description="edit local package repository",
-            help="edit local package repository",
-        ),
-        True,
+    snapshot_actions.add_parser(
+        "edit",
+        aliases=["rename"],
+        description="Change snapshot's description or name",
+        help="Change snapshot's description or name",
+        configure=snapshot_edit,
     )
 
-    repo_add(
-        repo_actions.add_parser(
-            "add",
-            description="add packages to local repository from .deb (binary packages)",
-            help="add packages to local repository from .deb (binary packages)",
-        )
+    snapshot_actions.add_parser(
+        "list",
+        description="list snapshots",
+        help="list snapshots",
+        configure=snapshot_list,
     )
 
-    repo_list(
-        repo_actions.add_parser(
-            "list", description="list local repos", help="list local repos"
-        )
+    snapshot_actions.add_parser(
+        "drop",
+        aliases=["delete"],
+        description="delete snapshots",
+        help="delete snapshots",
+        configure=snapshot_drop,
     )
 
-    repo_drop(
-        repo_actions.add_parser(
-            "drop",
-            aliases=["delete"],
-            description="delete local repos",
-            help="delete local repos",
-        )
+    snapshot_actions.add_parser(
+        "filter",
+        description="appplies filter to contents of one snapshot producing another snapshot",
+        help="appplies filter to contents of one snapshot producing another snapshot",
+        configure=snapshot_filter,
     )
 
-    repo_remove(
-        repo_actions.add_parser(
-            "remove",
-            description="remove packages from local repo",
-            help="remove packages from local repo",
-        )
+    snapshot_actions.add_parser(
+        "merge",
+        help="merges several source snapshots into new destination snapshot",
+        description="""Merges several source snapshots into new destination snapshot.
+        By default, packages with the same name-architecture pair
+        are replaced during merge (package from latest snapshot on the list wins).
+        With --latest flag, package with latest version wins.
+        With --no-remove flag, all versions of packages are preserved during merge.
+        If only one snapshot is specified, merge copies source into destination.
+        """,
+        configure=snapshot_merge,
     )
 
-    repo_copy_or_move(
-        repo_actions.add_parser(
-            "copy",
-            description="copy packages between local repos",
-            help="copy packages between local repos",
-        ),
-        False,
+    snapshot_actions.add_parser(
+        "diff",
+        description="displays difference in packages between two snapshots",
+        help="displays difference in packages between two snapshots",
+        configure=snapshot_diff,
     )
 
-    repo_copy_or_move(
-        repo_actions.add_parser(
-            "move",
-            description="move packages between local repos",
-            help="move packages between local repos",
-        ),
-        True,
+
+def publish_subcommand(parser: argparse.ArgumentParser) -> None:
+    """configure 'publish' subcommand"""
+    publish_actions = parser.add_subparsers(
+        dest="action",
+        metavar="<action>",
+        required=True,
+        action=LazySubParsersAction,
     )
 
-    # snapshot subcommand
-    snapshot_subcommand = subcommands.add_parser(
-        "snapshot", aliases=["snap"], help="manage snapshots"
+    publish_actions.add_parser(
+        "list",
+        description="list publishes",
+        help="list publishes",
+        configure=publish_list,
     )
 
-    snapshot_actions = snapshot_subcommand.add_subparsers(
-        dest="action", metavar="<action>", required=True
+    publish_actions.add_parser(
+        "snapshot",
+        description="publishes snapshot as repository to be consumed by apt",
+        help="publishes snapshot as repository to be consumed by apt",
+        configure=functools.partial(publish_create, snapshot_action=True),
     )
 
-    snapshot_create(
-        snapshot_actions.add_parser(
-            "create",
-            description="create snapshots from local repos",
-            help="create snapshots from local repos",
-        )
+    publish_actions.add_parser(
+        "repo",
+        description="publish local repository directly, bypassing snapshot creation step",
+        help="publish local repository directly, bypassing snapshot creation step",
+        configure=functools.partial(publish_create, snapshot_action=False),
     )
 
-    snapshot_edit(
-        snapshot_actions.add_parser(
-            "edit",
-            aliases=["rename"],
-            description="Change snapshot's description or name",
-            help="Change snapshot's description or name",
-        )
+    publish_actions.add_parser(
+        "update",
+        description="re-publish (update) published local repository",
+        help="re-publish (update) published local repository",
+        configure=publish_update,
     )
 
-    snapshot_list(
-        snapshot_actions.add_parser(
-            "list", description="list snapshots", help="list snapshots"
-        )
+    publish_actions.add_parser(
+        "switch",
+        description="switch in-place published repository with new snapshot contents",
+        help="switch in-place published repository with new snapshot contents",
+        configure=publish_switch,
     )
 
-    snapshot_drop(
-        snapshot_actions.add_parser(
-            "drop",
-            aliases=["delete"],
-            description="delete snapshots",
-            help="delete snapshots",
-        )
+    publish_actions.add_parser(
+        "drop",
+        description="drop publishes",
+        help="drop publishes",
+        configure=publish_drop,
     )
 
-    snapshot_filter(
-        snapshot_actions.add_parser(
-            "filter",
-            description="appplies filter to contents of one snapshot producing another snapshot",
-            help="appplies filter to contents of one snapshot producing another snapshot",
-        )
+
+def parse_args() -> argparse.Namespace:
+    """parse command line arguments"""
+    parser = argparse.ArgumentParser(prog="aptly-ctl")
+
+    parser.add_argument("--version", action="version", version=f"%(prog)s {VERSION}")
+
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="be more verbose. Repeat to enable debug messages",
     )
 
-    snapshot_merge(
-        snapshot_actions.add_parser(
-            "merge",
-            help="merges several source snapshots into new destination snapshot",
-            description="""Merges several source snapshots into new destination snapshot.
-            By default, packages with the same name-architecture pair
-            are replaced during merge (package from latest snapshot on the list wins).
-            With --latest flag, package with latest version wins.
-            With --no-remove flag, all versions of packages are preserved during merge.
-            If only one snapshot is specified, merge copies source into destination.
-            """,
-        )
+    parser.add_argument(
+        "--debug",
+        dest="verbose",
+        action="store_const",
+        const=2,
+        default=0,
+        help="enable debug messages, same as -vv",
     )
 
-    snapshot_diff(
-        snapshot_actions.add_parser(
-            "diff",
-            description="displays difference in packages between two snapshots",
-            help="displays difference in packages between two snapshots",
-        )
+    parser.add_argument("-c", "--config", help="path to config file")
+
+    parser.add_argument(
+        "-S",
+        "--section",
+        default="",
+        help="section from config file. By default first one is used",
     )
 
-    # publish subcommand
-    publish_subcommand = subcommands.add_parser(
-        "publish",
-        aliases=["pub"],
-        help="create publishes from local repos or snapshots and manage them",
+    parser.add_argument(
+        "-C",
+        "--config-key",
+        metavar="KEY=VALUE",
+        action="append",
+        default=[],
+        dest="config_keys",
+        help="""
+        provide value for configuration KEY.
+        Takes precedence over config file.
+        Use dots to set nested fields e.g. signing.gpgkey=somekey
+        """,
     )
 
-    publish_actions = publish_subcommand.add_subparsers(
-        dest="action", metavar="<action>", required=True
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=5,
+        help="number of worker threads for concurrent requests",
     )
 
-    publish_list(
-        publish_actions.add_parser(
-            "list", description="list publishes", help="list publishes"
-        )
+    subcommands = parser.add_subparsers(
+        dest="subcommand",
+        metavar="<subcommand>",
+        required=True,
+        action=LazySubParsersAction,
     )
 
-    publish_create(
-        publish_actions.add_parser(
-            "snapshot",
-            description="publishes snapshot as repository to be consumed by apt",
-            help="publishes snapshot as repository to be consumed by apt",
-        ),
-        True,
+    subcommands.add_parser(
+        "version",
+        aliases=["ver"],
+        description="show aptly server version",
+        help="show aptly server version",
+        configure=version,
     )
 
-    publish_create(
-        publish_actions.add_parser(
-            "repo",
-            description="publish local repository directly, bypassing snapshot creation step",
-            help="publish local repository directly, bypassing snapshot creation step",
-        ),
-        False,
+    subcommands.add_parser(
+        "package",
+        aliases=["pkg"],
+        help="search packages and show info about them",
+        configure=package_subcommand,
     )
 
-    publish_update(
-        publish_actions.add_parser(
-            "update",
-            description="re-publish (update) published local repository",
-            help="re-publish (update) published local repository",
-        )
+    subcommands.add_parser(
+        "repo",
+        help="manage local repos and add packages to them",
+        configure=repo_subcommand,
     )
 
-    publish_switch(
-        publish_actions.add_parser(
-            "switch",
-            description="switch in-place published repository with new snapshot contents",
-            help="switch in-place published repository with new snapshot contents",
-        )
+    subcommands.add_parser(
+        "snapshot",
+        aliases=["snap"],
+        help="manage snapshots",
+        configure=snapshot_subcommand,
     )
 
-    publish_drop(
-        publish_actions.add_parser(
-            "drop", description="drop publishes", help="drop publishes"
-        )
+    subcommands.add_parser(
+        "publish",
+        aliases=["pub"],
+        help="create publishes from local repos or snapshots and manage them",
+        configure=publish_subcommand,
     )
 
     return parser.parse_args()
@@ -1854,20 +2007,14 @@ def main() -> None:
     """entrypoint for command line"""
     args = parse_args()
 
-    log_level = logging.WARN
-    if args.verbose:
-        log_level = logging.INFO
-    if args.debug:
-        log_level = logging.DEBUG
+    log_level = [logging.WARN, logging.INFO, logging.DEBUG][min(args.verbose, 2)]
 
-    log_format = "%(levelname)s "
     if hasattr(args, "action"):
-        log_format += args.subcommand + "->" + args.action + "(%(process)d) "
+        command = f"{args.subcommand}->{args.action}"
     else:
-        log_format += args.subcommand + "(%(process)d) "
-    if log_level <= logging.DEBUG:
-        log_format += "[%(name)s:%(funcName)s()] "
-    log_format += "%(message)s"
+        command = args.subcommand
+    location = "[%(name)s:%(funcName)s()] " if log_level <= logging.DEBUG else ""
+    log_format = f"%(levelname)s {command}(%(process)d) {location}%(message)s"
 
     app_logger = logging.getLogger(__package__)
     app_logger.setLevel(log_level)
@@ -1880,6 +2027,10 @@ def main() -> None:
         urllib3_logger.setLevel(log_level)
         urllib3_logger.addHandler(app_log_handler)
 
+    import urllib3.exceptions  # type: ignore # https://github.com/urllib3/urllib3/issues/1897
+    from aptly_ctl.aptly import Client
+    from aptly_ctl.config import Config, parse_override_dict
+
     override = parse_override_dict(args.config_keys)
     config = Config(path=args.config, section=args.section, override=override)
     aptly = Client(
@@ -1902,6 +2053,6 @@ def main() -> None:
             error_msg += f": {exc.__cause__}"
         elif exc.__context__:
             error_msg += f": {exc.__context__}"
-        log.error(error_msg)
+        log.error("%s", error_msg)
         log.debug("Printing traceback for error above", exc_info=True)
         sys.exit(2)
@@ -1,7 +1,9 @@
-from typing import Callable, Any, Iterable, List, Dict
+from typing import Callable, Any, Iterable, List, Dict, Sequence
 from datetime import timedelta
 import shutil
+import sys
 from math import ceil
+from itertools import zip_longest
 
 
 def rotate(
@@ -76,7 +78,7 @@ def size_pretty(size: int) -> str:
 
 
 def format_table(
-    orig_table: List[List[Any]],
+    orig_table: Sequence[Sequence[Any]],
     max_col_width: int,
     sep: str = " ",
     min_subtable_col_num: int = 1,
@@ -86,7 +88,8 @@ def format_table(
     List elements are arranged into a subtable. For every row of this subtable except the first
     a blank row is added to contain table rows. If blank row were created before,
     the elements at corresponding index are set.
-    Cannot handle NamedTuple correctly.
+    Rows may be any sequence, including NamedTuples. Cells that are sequences are
+    expanded into subtables, so a NamedTuple used as a cell is expanded too.
 
     Arguments:
         max_col_width -- maximum column width. Taken into account
@@ -143,12 +146,8 @@ def format_table(
 
 def get_column_sizes(table: List[List[str]]) -> List[int]:
     """return a list of max sizes of every column in the table"""
-    col_sizes = [0] * len(table[0])
-    for row in table:
-        for index, elem in enumerate(row):
-            if len(elem) >= col_sizes[index]:
-                col_sizes[index] = len(elem)
-    return col_sizes
+    # rows of a subtable built by format_table may be shorter than the first one
+    return [max(map(len, col)) for col in zip_longest(*table, fillvalue="")]
 
 
 def normalize_table(table: List[List[str]]) -> None:
@@ -159,16 +158,20 @@ def normalize_table(table: List[List[str]]) -> None:
     col_sizes = get_column_sizes(table)
     for row in table:
         for col_index, elem in enumerate(row):
-            row[col_index] += " " * (col_sizes[col_index] - len(elem))
+            row[col_index] = elem.ljust(col_sizes[col_index])
 
 
 def print_table(
-    orig_table: List[List[Any]],
-    header: List[str] = None,
+    orig_table: Sequence[Sequence[Any]],
+    header: Sequence[str] = None,
     sep: str = " ",
     header_sep: str = "-",
 ) -> None:
-    """Prints matrix orig_table converting every element to string as table"""
+    """
+    Prints matrix orig_table converting every element to string as table.
+    Rows may be any sequence, including NamedTuples. Cells that are sequences are
+    expanded into subtables (see format_table), so a NamedTuple used as a cell is expanded too
+    """
     if not orig_table:
         return
     # assume that all row are of equal width
@@ -178,10 +181,11 @@ def print_table(
     max_col_size = term_width // row_len - len(sep)
     table = format_table(orig_table, max_col_size)
     if header:
-        table.insert(0, header)
+        # copy since normalize_table pads cells in place
+        table.insert(0, list(header))
     normalize_table(table)
     if header:
         header_sep_row = [header_sep * size for size in map(len, table[0])]
         table.insert(1, header_sep_row)
-    for row in table:
-        print(*row, sep=sep)
+    # a single write instead of a print call per row
+    sys.stdout.write("\n".join(sep.join(row) for row in table) + "\n")
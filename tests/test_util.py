@@ -1,5 +1,11 @@
 from datetime import timedelta
-from aptly_ctl.util import rotate, urljoin, timedelta_pretty
+from aptly_ctl.util import (
+    rotate,
+    urljoin,
+    timedelta_pretty,
+    normalize_table,
+    get_column_sizes,
+)
 from aptly_ctl.aptly import Package
 
 
@@ -138,3 +144,13 @@ def test_timedelta_pretty():
         (timedelta(weeks=2, hours=5), "14d5h"),
     ]:
         assert timedelta_pretty(inp) == expected
+
+
+def test_normalize_table():
+    table = [["a", "bbb", ""], ["cc", "", "d"]]
+    normalize_table(table)
+    assert table == [["a ", "bbb", " "], ["cc", "   ", "d"]]
+
+
+def test_get_column_sizes():
+    assert get_column_sizes([["a", "bbb"], ["cc", ""], ["dddd"]]) == [4, 3]